@@ -1,11 +1,16 @@
 import dataclasses
 import json
 import os
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from datetime import date, datetime
+from typing import TextIO
 
 import yaml
-from dacite import from_dict
+
+try:
+    from yaml import CSafeLoader as YamlSafeLoader
+except ImportError:
+    from yaml import SafeLoader as YamlSafeLoader
 
 
 @dataclass
@@ -24,6 +29,13 @@ class Finbox:
     cookies: dict
 
 
+@dataclass
+class HttpCache:
+    file_name: str
+    financial_indicators_expire_after: int
+    stock_page_expire_after: int
+
+
 @dataclass
 class Storage:
     keep_last_files_count: int
@@ -53,18 +65,26 @@ class Config:
     @classmethod
     def from_yaml(cls, file_path: str):
         with open(file_path, 'r') as f:
-            config_dict = yaml.safe_load(f)
+            config_dict = yaml.load(f, Loader=YamlSafeLoader)
 
-        return from_dict(data_class=cls, data=config_dict)
+        return cls(
+            tadawul=Tadawul(**config_dict['tadawul']),
+            finbox=Finbox(**config_dict['finbox']),
+            http_cache=HttpCache(**config_dict['http_cache']),
+            storage=Storage(**config_dict['storage']),
+            portfolio=Portfolio(**config_dict['portfolio']),
+            excel=Excel(**config_dict['excel']),
+        )
 
     tadawul: Tadawul
     finbox: Finbox
+    http_cache: HttpCache
     storage: Storage
     portfolio: Portfolio
     excel: Excel
 
 
-@dataclass
+@dataclass(slots=True)
 class Dividend:
     announcement_date: datetime
     due_date: datetime
@@ -72,22 +92,45 @@ class Dividend:
     distribution_way: str
     amount: float
 
+    def __post_init__(self):
+        # dividends loaded back from storage carry their dates as strings
+        if isinstance(self.due_date, str):
+            self.due_date = datetime.fromisoformat(self.due_date)
 
-@dataclass
+    @property
+    def due_year(self) -> int | None:
+        return self.due_date.year if self.due_date is not None else None
+
+
+@dataclass(slots=True)
 class Benchmark:
     div_yield: float = None
     p_e: float = None
     p_b: float = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FairValue:
     average: float
     uncertainty: str
 
 
-@dataclass
+@dataclass(slots=True)
 class Stock:
+    @classmethod
+    def from_dict(cls, data: dict):
+        data = dict(data)
+        dividends = data.pop('dividends', None)
+        benchmark = data.pop('benchmark', None)
+        fair_value = data.pop('fair_value', None)
+
+        return cls(
+            **data,
+            dividends=[Dividend(**dividend) for dividend in dividends] if dividends is not None else None,
+            benchmark=Benchmark(**benchmark) if benchmark is not None else None,
+            fair_value=FairValue(**fair_value) if fair_value is not None else None,
+        )
+
     name: str = None
     sector: str = None
     industry_group: str = None
@@ -110,23 +153,44 @@ class Stock:
     scraped_at: datetime = None
     success_scraping: bool = None
 
+    def name_key(self) -> tuple[str, str] | None:
+        if self.name is None or self.industry_group is None:
+            return None
+        return (self.name.lower(), self.industry_group.lower())
 
-@dataclass
+
+@dataclass(slots=True)
 class StockData:
+    @classmethod
+    def from_dict(cls, data: dict):
+        return cls(
+            all_success=data['all_success'],
+            date=data['date'],
+            stocks=[Stock.from_dict(stock) for stock in data['stocks']],
+        )
+
     all_success: bool
     date: date
     stocks: list[Stock]
 
-    def to_json(self):
-        return json.dumps(dataclasses.asdict(self), indent=4, default=str)
+    def write_json(self, file: TextIO) -> None:
+        json.dump(dataclasses.asdict(self), file, indent=4, default=str)
 
 
-@dataclass
+@dataclass(slots=True)
 class FinancialIndicators:
     date: date
     stocks: list[Stock]
     industry_groups: list[str]
     headers: list[str]
+    stocks_index: dict[tuple[str, str], Stock] = field(default=None, init=False, repr=False)
+
+    def __post_init__(self):
+        self.stocks_index = {}
+        for stock in self.stocks:
+            name_key = stock.name_key()
+            if name_key is not None:
+                self.stocks_index.setdefault(name_key, stock)
 
 
 config = Config.from_yaml(file_path=os.path.join(os.path.dirname(__file__), 'config.yaml'))
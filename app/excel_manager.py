@@ -1,17 +1,31 @@
 import logging
 import os
+import warnings
+from collections import defaultdict
+from dataclasses import dataclass
 from datetime import datetime, date
 from enum import Enum
 
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.formatting.rule import ColorScaleRule
 from openpyxl.styles import Alignment, Font
-from openpyxl.worksheet.table import Table, TableStyleInfo
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableColumn, TableStyleInfo
 
 from analytics import Analytics
 from config import config, Stock, StockData, FinancialIndicators
 from scraper import FinancialIndicatorsColumnsIndex
 
+SHEET_DATE_FONT = Font(size=12, bold=True)
+HEADER_FONT = Font(size=14, bold=True)
+BIG_HEADER_FONT = Font(size=15, bold=True)
+BOLD_FONT = Font(bold=True)
+CENTER_ALIGNMENT = Alignment(horizontal='center', vertical='center')
+CENTER_WRAP_ALIGNMENT = Alignment(horizontal='center', vertical='center', wrap_text=True)
+NUMBER_FORMAT = '0.00'
+PERCENTAGE_FORMAT = '0.00%'
+
 
 class StocksTableColumns(Enum):
     SECTOR = 'Sector'
@@ -32,6 +46,14 @@ class StocksTableColumns(Enum):
     DIVIDEND_YIELD = '% Div Yield'
 
 
+@dataclass(slots=True)
+class StocksTableColumnFormat:
+    name: str
+    alignment: Alignment
+    font: Font = None
+    number_format: str = None
+
+
 class ExcelManager:
     def __init__(self):
         self.analytics = Analytics()
@@ -40,12 +62,17 @@ class ExcelManager:
         self.stocks_analysis_sheet_name = config.excel.stocks_analysis_sheet_name
         self.market_analysis_file_name = config.excel.market_analysis_file_name
         self.market_analysis_sheet_name = config.excel.market_analysis_sheet_name
-        self.last_three_years = self.__get_last_three_years()
+        self.last_three_years_int = self.__get_last_three_years()
+        self.last_three_years = [str(year) for year in self.last_three_years_int]
         self.stocks_table_name = config.excel.stocks_table_name
         self.stocks_table_start_row = config.excel.stocks_table_start_row
         self.market_table_start_row = config.excel.market_table_start_row
         self.stocks_table_cols = [col.value for col in StocksTableColumns]
         self.stocks_table_cols.extend(self.last_three_years)
+        self.stocks_table_cols_index = {col: index for index, col in enumerate(self.stocks_table_cols)}
+        self.stocks_table_cols_letter = {col: get_column_letter(index + 1) for col, index in
+                                         self.stocks_table_cols_index.items()}
+        self.stocks_table_cols_format = self.__get_stocks_table_cols_format()
 
         self.__create_folder_if_not_exists()
 
@@ -57,10 +84,10 @@ class ExcelManager:
 
         file_name = f'{self.stocks_analysis_file_name}_{file_date}.xlsx'
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = self.stocks_analysis_sheet_name
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=self.stocks_analysis_sheet_name)
 
+        self.__set_columns_width(ws, len(self.stocks_table_cols))
         self.__create_sheet_date(ws, stock_data.date)
         self.__create_stocks_table(ws, stock_data)
 
@@ -75,10 +102,10 @@ class ExcelManager:
 
         file_name = f'{self.market_analysis_file_name}_{file_date}.xlsx'
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = self.market_analysis_sheet_name
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet(title=self.market_analysis_sheet_name)
 
+        self.__set_columns_width(ws, len(financial_indicators.headers))
         self.__create_sheet_date(ws, financial_indicators.date)
         self.__create_market_tables(ws, financial_indicators)
 
@@ -89,271 +116,302 @@ class ExcelManager:
         if not os.path.exists(self.folder_name):
             os.makedirs(self.folder_name)
 
-    def __get_last_three_years(self) -> list[str]:
+    def __get_last_three_years(self) -> list[int]:
         year = datetime.now().year
-        return [str(year), str(year - 1), str(year - 2)]
+        return [year, year - 1, year - 2]
+
+    def __set_columns_width(self, ws, cols_count: int) -> None:
+        for col_index in range(cols_count):
+            ws.column_dimensions[get_column_letter(col_index + 1)].width = 15
 
     def __create_sheet_date(self, ws, date: date) -> None:
-        ws['A1'] = 'Date'
-        ws['B1'] = date
+        date_title_cell = WriteOnlyCell(ws, value='Date')
+        date_cell = WriteOnlyCell(ws, value=date)
+
+        date_title_cell.font = date_cell.font = SHEET_DATE_FONT
 
-        ws['A1'].font = ws['B1'].font = Font(size=12, bold=True)
+        date_title_cell.style = 'Headline 1'
+        date_cell.style = 'Headline 2'
 
-        ws['A1'].style = 'Headline 1'
-        ws['B1'].style = 'Headline 2'
+        date_title_cell.alignment = date_cell.alignment = CENTER_ALIGNMENT
 
-        ws['A1'].alignment = ws['B1'].alignment = Alignment(horizontal='center', vertical='center')
+        date_cell.number_format = 'dd/mm/yyyy'
 
-        ws['B1'].number_format = 'dd/mm/yyyy'
+        ws.append([date_title_cell, date_cell])
 
     def __create_stocks_table(self, ws, stock_data: StockData) -> None:
         protfolio_total_value = self.analytics.get_portfolio_total_value(stock_data.stocks)
 
-        ws.row_dimensions[self.stocks_table_start_row].height = 60
-        for col_index, col in enumerate(self.stocks_table_cols):
-            col_letter = f'{chr(65 + col_index)}'
-            ws.column_dimensions[col_letter].width = 15
+        self.__append_empty_rows(ws, self.stocks_table_start_row - 3)
 
-            cell_name = self.__get_cell_name_stock_table(col, self.stocks_table_start_row)
-            ws[cell_name] = col
-            ws[cell_name].font = Font(size=14, bold=True)
-            ws[cell_name].style = 'Headline 1'
-            ws[cell_name].alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        dividends_header_row = [None] * len(self.stocks_table_cols)
+        dividends_col_index = self.stocks_table_cols_index[self.last_three_years[0]]
+        dividends_header_cell = WriteOnlyCell(ws, value='Dividends')
+        dividends_header_cell.font = BIG_HEADER_FONT
+        dividends_header_cell.style = 'Headline 1'
+        dividends_header_cell.alignment = CENTER_WRAP_ALIGNMENT
+        dividends_header_row[dividends_col_index] = dividends_header_cell
+        ws.append(dividends_header_row)
 
         dividend_cell_for_last_year = self.__get_cell_name_stock_table(self.last_three_years[0],
                                                                        self.stocks_table_start_row - 1)
         dividend_cell_for_three_years_ago = self.__get_cell_name_stock_table(self.last_three_years[2],
                                                                              self.stocks_table_start_row - 1)
-        ws.merge_cells(f'{dividend_cell_for_last_year}:{dividend_cell_for_three_years_ago}')
-        ws[dividend_cell_for_last_year].value = 'Dividends'
-        ws[dividend_cell_for_last_year].font = Font(size=15, bold=True)
-        ws[dividend_cell_for_last_year].style = 'Headline 1'
-        ws[dividend_cell_for_last_year].alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        ws.merged_cells.add(f'{dividend_cell_for_last_year}:{dividend_cell_for_three_years_ago}')
+
+        ws.row_dimensions[self.stocks_table_start_row].height = 60
+        ws.append(self.__create_header_row(ws, self.stocks_table_cols))
 
         for index, stock in enumerate(stock_data.stocks):
             row_index = self.stocks_table_start_row + index + 1
             ws.row_dimensions[row_index].height = 30
-            self.__create_stock_row(ws, stock, protfolio_total_value, row_index)
+            ws.append(self.__create_stock_row(ws, stock, protfolio_total_value, row_index))
+
+        if len(stock_data.stocks) > 0:
+            first_row = self.stocks_table_start_row + 1
+            last_row = self.stocks_table_start_row + len(stock_data.stocks)
+            for col in [StocksTableColumns.PERCENTAGE_CHANGE_FROM_COST_PRICE.value,
+                        StocksTableColumns.DIFFERENCE_FROM_FAIR_VALUE.value]:
+                col_first_cell = self.__get_cell_name_stock_table(col, first_row)
+                col_last_cell = self.__get_cell_name_stock_table(col, last_row)
+                ws.conditional_formatting.add(f'{col_first_cell}:{col_last_cell}',
+                                              ColorScaleRule(start_type='num', start_value=0, start_color='c6efce',
+                                                             end_type='num', end_value=0, end_color='ffc7ce'))
 
         table_start_cell = self.__get_cell_name_stock_table(self.stocks_table_cols[0], self.stocks_table_start_row)
         table_end_cell = self.__get_cell_name_stock_table(self.stocks_table_cols[-1],
                                                           self.stocks_table_start_row + len(stock_data.stocks) + 1)
-        table = Table(displayName=self.stocks_table_name, ref=f"{table_start_cell}:{table_end_cell}")
-        table.tableStyleInfo = TableStyleInfo(name='TableStyleLight20', showFirstColumn=False, showLastColumn=False,
-                                              showRowStripes=True, showColumnStripes=False)
-        ws.add_table(table)
+        self.__add_table(ws, self.stocks_table_name, f"{table_start_cell}:{table_end_cell}", self.stocks_table_cols)
+
+    def __create_stock_row(self, ws, stock: Stock, protfolio_total_value: float, row_index: int) -> list[WriteOnlyCell]:
+        values = self.__get_stock_row_values(stock, protfolio_total_value, row_index)
 
-    def __create_stock_row(self, ws, stock: Stock, protfolio_total_value: float, row_index: int) -> None:
-        sector_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.SECTOR.value, row_index)
-        stock_code_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.STOCK_CODE.value, row_index)
-        stock_name_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.STOCK_NAME.value, row_index)
+        row_cells = []
+        for col_format in self.stocks_table_cols_format:
+            cell = WriteOnlyCell(ws, value=values[col_format.name])
+            cell.alignment = col_format.alignment
+            if col_format.font is not None:
+                cell.font = col_format.font
+            if col_format.number_format is not None:
+                cell.number_format = col_format.number_format
+            row_cells.append(cell)
+
+        return row_cells
+
+    def __get_stock_row_values(self, stock: Stock, protfolio_total_value: float, row_index: int) -> dict:
         price_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.PRICE.value, row_index)
         cost_price_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.COST_PRICE.value, row_index)
-        percentage_change_from_cost_price_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.PERCENTAGE_CHANGE_FROM_COST_PRICE.value, row_index)
-        price_earnings_ratio_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.PRICE_EARNINGS_RATIO.value,
-                                                                          row_index)
-        dividend_yield_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.DIVIDEND_YIELD.value, row_index)
-        percentage_of_portfolio_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.PERCENTAGE_OF_PORTFOLIO.value, row_index)
         _52_week_high_cell_name = self.__get_cell_name_stock_table(StocksTableColumns._52_WEEK_HIGH.value, row_index)
-        difference_from_52_week_high_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.DIIFERENCE_FROM_52_WEEK_HIGH.value, row_index)
         _52_week_low_cell_name = self.__get_cell_name_stock_table(StocksTableColumns._52_WEEK_LOW.value, row_index)
-        difference_from_52_week_low_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.DIIFERENCE_FROM_52_WEEK_LOW.value, row_index)
         fair_value_cell_name = self.__get_cell_name_stock_table(StocksTableColumns.FAIR_VALUE.value, row_index)
-        difference_from_from_fair_value_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.DIFFERENCE_FROM_FAIR_VALUE.value, row_index)
-        fair_value_uncertainty_cell_name = self.__get_cell_name_stock_table(
-            StocksTableColumns.FAIR_VALUE_UNCERTAINTY.value, row_index)
-        last_year_dividend_cell_name = self.__get_cell_name_stock_table(self.last_three_years[0], row_index)
-        two_years_ago_dividend_cell_name = self.__get_cell_name_stock_table(self.last_three_years[1], row_index)
-        three_years_ago_dividend_cell_name = self.__get_cell_name_stock_table(self.last_three_years[2], row_index)
-
-        ws[sector_cell_name] = '' if stock.sector is None else stock.sector
-        ws[stock_code_cell_name] = '' if stock.code is None else stock.code
-        ws[stock_name_cell_name] = '' if stock.name is None else stock.name
-
-        ws[price_cell_name] = '' if stock.price is None else stock.price
-        ws[cost_price_cell_name] = '' if stock.cost_price is None else stock.cost_price
-        ws[
-            percentage_change_from_cost_price_cell_name].value = f'=({price_cell_name}-{cost_price_cell_name})/{cost_price_cell_name}'
-        ws[percentage_of_portfolio_cell_name] = '' if stock.price is None or stock.quantity_owned is None else (
-                                                                                                                       stock.price * stock.quantity_owned) / protfolio_total_value
-
-        ws[_52_week_high_cell_name] = '' if stock._52_week_high is None else stock._52_week_high
-        ws[
-            difference_from_52_week_high_cell_name].value = f'=({price_cell_name}-{_52_week_high_cell_name})/{_52_week_high_cell_name}'
-        ws[_52_week_low_cell_name] = '' if stock._52_week_low is None else stock._52_week_low
-        ws[
-            difference_from_52_week_low_cell_name].value = f'=({price_cell_name}-{_52_week_low_cell_name})/{_52_week_low_cell_name}'
-
-        ws[
-            price_earnings_ratio_cell_name] = '' if stock.benchmark is None or stock.benchmark.p_e is None else stock.benchmark.p_e
-        ws[
-            dividend_yield_cell_name] = '' if stock.benchmark is None or stock.benchmark.div_yield is None else stock.benchmark.div_yield
-
-        ws[
-            fair_value_cell_name] = '' if stock.fair_value is None or stock.fair_value.average is None else stock.fair_value.average
-        ws[
-            difference_from_from_fair_value_cell_name].value = f'=({price_cell_name}-{fair_value_cell_name})/{fair_value_cell_name}'
-        ws[
-            fair_value_uncertainty_cell_name] = '' if stock.fair_value is None or stock.fair_value.uncertainty is None else stock.fair_value.uncertainty
-
-        ws[last_year_dividend_cell_name] = self.analytics.get_dividends_sum_amount_for_year(stock, int(
-            self.last_three_years[0]))
-        ws[two_years_ago_dividend_cell_name] = self.analytics.get_dividends_sum_amount_for_year(stock, int(
-            self.last_three_years[1]))
-        ws[three_years_ago_dividend_cell_name] = self.analytics.get_dividends_sum_amount_for_year(stock, int(
-            self.last_three_years[2]))
-
-        self.__center_align_cells(ws, [stock_code_cell_name, price_cell_name, cost_price_cell_name,
-                                       percentage_change_from_cost_price_cell_name,
-                                       dividend_yield_cell_name, last_year_dividend_cell_name,
-                                       two_years_ago_dividend_cell_name, three_years_ago_dividend_cell_name,
-                                       fair_value_uncertainty_cell_name,
-                                       percentage_of_portfolio_cell_name, _52_week_high_cell_name,
-                                       difference_from_52_week_high_cell_name, _52_week_low_cell_name,
-                                       difference_from_52_week_low_cell_name, fair_value_cell_name,
-                                       difference_from_from_fair_value_cell_name, price_earnings_ratio_cell_name])
-
-        self.__center_align_cells(ws, [sector_cell_name, stock_name_cell_name],
-                                  wrap_text=True)
-
-        self.__set_cell_number_format(ws, [price_cell_name, cost_price_cell_name, price_earnings_ratio_cell_name,
-                                           _52_week_high_cell_name, _52_week_low_cell_name,
-                                           fair_value_cell_name, last_year_dividend_cell_name,
-                                           two_years_ago_dividend_cell_name, three_years_ago_dividend_cell_name],
-                                      '0.00')
-
-        self.__set_cell_number_format(ws, [percentage_of_portfolio_cell_name, dividend_yield_cell_name,
-                                           percentage_change_from_cost_price_cell_name,
-                                           difference_from_from_fair_value_cell_name,
-                                           difference_from_52_week_high_cell_name,
-                                           difference_from_52_week_low_cell_name], '0.00%')
-
-        self.__bold_cells(ws,
-                          [price_cell_name, percentage_change_from_cost_price_cell_name, price_earnings_ratio_cell_name,
-                           dividend_yield_cell_name, _52_week_high_cell_name, _52_week_low_cell_name])
-
-        ws.conditional_formatting.add(percentage_change_from_cost_price_cell_name,
-                                      ColorScaleRule(start_type='num', start_value=0, start_color='c6efce',
-                                                     end_type='num', end_value=0, end_color='ffc7ce'))
-        ws.conditional_formatting.add(difference_from_from_fair_value_cell_name,
-                                      ColorScaleRule(start_type='num', start_value=0, start_color='c6efce',
-                                                     end_type='num', end_value=0, end_color='ffc7ce'))
+
+        benchmark = stock.benchmark
+        fair_value = stock.fair_value
+
+        values = {
+            StocksTableColumns.SECTOR.value: '' if stock.sector is None else stock.sector,
+            StocksTableColumns.STOCK_CODE.value: '' if stock.code is None else stock.code,
+            StocksTableColumns.STOCK_NAME.value: '' if stock.name is None else stock.name,
+            StocksTableColumns.PRICE.value: '' if stock.price is None else stock.price,
+            StocksTableColumns.COST_PRICE.value: '' if stock.cost_price is None else stock.cost_price,
+            StocksTableColumns.PERCENTAGE_CHANGE_FROM_COST_PRICE.value:
+                f'=({price_cell_name}-{cost_price_cell_name})/{cost_price_cell_name}',
+            StocksTableColumns.PERCENTAGE_OF_PORTFOLIO.value:
+                '' if stock.price is None or stock.quantity_owned is None else (
+                        stock.price * stock.quantity_owned) / protfolio_total_value,
+            StocksTableColumns._52_WEEK_HIGH.value: '' if stock._52_week_high is None else stock._52_week_high,
+            StocksTableColumns.DIIFERENCE_FROM_52_WEEK_HIGH.value:
+                f'=({price_cell_name}-{_52_week_high_cell_name})/{_52_week_high_cell_name}',
+            StocksTableColumns._52_WEEK_LOW.value: '' if stock._52_week_low is None else stock._52_week_low,
+            StocksTableColumns.DIIFERENCE_FROM_52_WEEK_LOW.value:
+                f'=({price_cell_name}-{_52_week_low_cell_name})/{_52_week_low_cell_name}',
+            StocksTableColumns.PRICE_EARNINGS_RATIO.value:
+                '' if benchmark is None or benchmark.p_e is None else benchmark.p_e,
+            StocksTableColumns.FAIR_VALUE.value:
+                '' if fair_value is None or fair_value.average is None else fair_value.average,
+            StocksTableColumns.DIFFERENCE_FROM_FAIR_VALUE.value:
+                f'=({price_cell_name}-{fair_value_cell_name})/{fair_value_cell_name}',
+            StocksTableColumns.FAIR_VALUE_UNCERTAINTY.value:
+                '' if fair_value is None or fair_value.uncertainty is None else fair_value.uncertainty,
+            StocksTableColumns.DIVIDEND_YIELD.value:
+                '' if benchmark is None or benchmark.div_yield is None else benchmark.div_yield,
+        }
+
+        dividends_sum_by_year = self.analytics.get_dividends_sum_amount_by_year(stock)
+        for year_col, year in zip(self.last_three_years, self.last_three_years_int):
+            values[year_col] = dividends_sum_by_year.get(year, '')
+
+        return values
+
+    def __get_stocks_table_cols_format(self) -> list[StocksTableColumnFormat]:
+        wrapped_cols = [StocksTableColumns.SECTOR.value, StocksTableColumns.STOCK_NAME.value]
+        bold_cols = [StocksTableColumns.PRICE.value, StocksTableColumns.PERCENTAGE_CHANGE_FROM_COST_PRICE.value,
+                     StocksTableColumns.PRICE_EARNINGS_RATIO.value, StocksTableColumns.DIVIDEND_YIELD.value,
+                     StocksTableColumns._52_WEEK_HIGH.value, StocksTableColumns._52_WEEK_LOW.value]
+        number_cols = [StocksTableColumns.PRICE.value, StocksTableColumns.COST_PRICE.value,
+                       StocksTableColumns.PRICE_EARNINGS_RATIO.value, StocksTableColumns._52_WEEK_HIGH.value,
+                       StocksTableColumns._52_WEEK_LOW.value, StocksTableColumns.FAIR_VALUE.value,
+                       *self.last_three_years]
+        percentage_cols = [StocksTableColumns.PERCENTAGE_OF_PORTFOLIO.value, StocksTableColumns.DIVIDEND_YIELD.value,
+                           StocksTableColumns.PERCENTAGE_CHANGE_FROM_COST_PRICE.value,
+                           StocksTableColumns.DIFFERENCE_FROM_FAIR_VALUE.value,
+                           StocksTableColumns.DIIFERENCE_FROM_52_WEEK_HIGH.value,
+                           StocksTableColumns.DIIFERENCE_FROM_52_WEEK_LOW.value]
+
+        cols_format = []
+        for col in self.stocks_table_cols:
+            if col in number_cols:
+                number_format = NUMBER_FORMAT
+            elif col in percentage_cols:
+                number_format = PERCENTAGE_FORMAT
+            else:
+                number_format = None
+
+            cols_format.append(StocksTableColumnFormat(
+                name=col,
+                alignment=CENTER_WRAP_ALIGNMENT if col in wrapped_cols else CENTER_ALIGNMENT,
+                font=BOLD_FONT if col in bold_cols else None,
+                number_format=number_format
+            ))
+        return cols_format
 
     def __create_market_tables(self, ws, financial_indicators: FinancialIndicators):
         table_start_row = self.market_table_start_row
 
-        for col_index, _ in enumerate(financial_indicators.headers):
-            col_letter = f'{chr(65 + col_index)}'
-            ws.column_dimensions[col_letter].width = 15
+        self.__append_empty_rows(ws, table_start_row - 2)
+
+        stocks_by_industry_group = defaultdict(list)
+        for stock in financial_indicators.stocks:
+            stocks_by_industry_group[stock.industry_group].append(stock)
 
         for industry_group in financial_indicators.industry_groups:
-            industry_group_stocks = [stock for stock in financial_indicators.stocks if
-                                     stock.industry_group == industry_group]
+            industry_group_stocks = stocks_by_industry_group.get(industry_group, [])
 
             if len(industry_group_stocks) == 0:
                 continue
 
             self.__create_market_table(ws, industry_group_stocks, financial_indicators.headers, table_start_row,
                                        industry_group)
+            self.__append_empty_rows(ws, 3)
             table_start_row += len(industry_group_stocks) + 4
 
     def __create_market_table(self, ws, stocks: list[Stock], headers: list[str], start_row: int, industry_group: str):
         ws.row_dimensions[start_row].height = 60
-        for col_index, col in enumerate(headers):
-            cell_name = self.__get_cell_name(col_index, start_row)
-            ws[cell_name] = col
-            ws[cell_name].font = Font(size=14, bold=True)
-            ws[cell_name].style = 'Headline 1'
-            ws[cell_name].alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        ws.append(self.__create_header_row(ws, headers))
 
         industry_group_col_first_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.INDUSTRY_GROUP.value,
                                                              start_row + 1)
         industry_group_col_last_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.INDUSTRY_GROUP.value,
                                                             len(stocks) + start_row)
-        ws.merge_cells(f'{industry_group_col_first_cell}:{industry_group_col_last_cell}')
-        ws[industry_group_col_first_cell].value = industry_group
-        ws[industry_group_col_first_cell].font = Font(size=15, bold=True)
-        ws[industry_group_col_first_cell].style = 'Headline 1'
-        ws[industry_group_col_first_cell].alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+        ws.merged_cells.add(f'{industry_group_col_first_cell}:{industry_group_col_last_cell}')
+
+        industry_group_cell = WriteOnlyCell(ws, value=industry_group)
+        industry_group_cell.font = BIG_HEADER_FONT
+        industry_group_cell.style = 'Headline 1'
+        industry_group_cell.alignment = CENTER_WRAP_ALIGNMENT
 
         table_row = start_row + 1
         for stock in stocks:
             ws.row_dimensions[table_row].height = 30
-            self.__create_market_table_row(ws, stock, table_row)
+            row_cells = self.__create_market_table_row(ws, stock, len(headers))
+            if table_row == start_row + 1:
+                row_cells[FinancialIndicatorsColumnsIndex.INDUSTRY_GROUP.value] = industry_group_cell
+            ws.append(row_cells)
             table_row += 1
 
         table_start_cell = self.__get_cell_name(1, start_row)
         table_end_cell = self.__get_cell_name(len(headers) - 1, len(stocks) + start_row)
-        table = Table(displayName=industry_group.replace(" ", ""), ref=f"{table_start_cell}:{table_end_cell}")
+        self.__add_table(ws, industry_group.replace(" ", ""), f"{table_start_cell}:{table_end_cell}", headers[1:])
+
+    def __create_market_table_row(self, ws, stock: Stock, cols_count: int) -> list[WriteOnlyCell]:
+        row_cells = [None] * cols_count
+
+        def market_table_cell(col_index: int) -> WriteOnlyCell:
+            row_cells[col_index + 1] = WriteOnlyCell(ws)
+            return row_cells[col_index + 1]
+
+        stock_name_cell = market_table_cell(FinancialIndicatorsColumnsIndex.COMPANY.value)
+        stock_price_cell = market_table_cell(FinancialIndicatorsColumnsIndex.PRICE.value)
+        stock_issued_shares_cell = market_table_cell(FinancialIndicatorsColumnsIndex.ISSUED_SHARES.value)
+        stock_net_income_cell = market_table_cell(FinancialIndicatorsColumnsIndex.NET_INCOME.value)
+        stock_shareholders_equity_cell = market_table_cell(FinancialIndicatorsColumnsIndex.SHAREHOLDERS_EQUITY.value)
+        stock_market_cap_cell = market_table_cell(FinancialIndicatorsColumnsIndex.MARKET_CAP.value)
+        stock_market_cap_percentage_cell = market_table_cell(FinancialIndicatorsColumnsIndex.MARKET_CAP_PERCENTAGE.value)
+        stock_earnings_per_share_cell = market_table_cell(FinancialIndicatorsColumnsIndex.EARNINGS_PER_SHARE.value)
+        stock_pe_ratio_cell = market_table_cell(FinancialIndicatorsColumnsIndex.P_E_RATIO.value)
+        stock_book_value_cell = market_table_cell(FinancialIndicatorsColumnsIndex.BOOK_VALUE.value)
+        stock_pb_ratio_cell = market_table_cell(FinancialIndicatorsColumnsIndex.P_B_RATIO.value)
+
+        benchmark = stock.benchmark
+        stock_name_cell.value = stock.name or ''
+        stock_price_cell.value = stock.price or ''
+        stock_issued_shares_cell.value = stock.issued_shares or ''
+        stock_net_income_cell.value = stock.net_profit or ''
+        stock_shareholders_equity_cell.value = stock.shareholders_equity or ''
+        stock_market_cap_cell.value = stock.market_cap or ''
+        stock_market_cap_percentage_cell.value = stock.market_cap_percentage or ''
+        stock_earnings_per_share_cell.value = stock.earnings_per_share or ''
+        stock_pe_ratio_cell.value = benchmark.p_e or ''
+        stock_book_value_cell.value = stock.book_value_per_share or ''
+        stock_pb_ratio_cell.value = benchmark.p_b or ''
+
+        self.__center_align_cells([stock_price_cell, stock_issued_shares_cell, stock_net_income_cell,
+                                   stock_shareholders_equity_cell, stock_market_cap_cell,
+                                   stock_market_cap_percentage_cell, stock_earnings_per_share_cell,
+                                   stock_pe_ratio_cell, stock_book_value_cell, stock_pb_ratio_cell])
+
+        self.__center_align_cells([stock_name_cell], wrap_text=True)
+
+        self.__bold_cells([stock_net_income_cell, stock_market_cap_cell, stock_pe_ratio_cell, stock_pb_ratio_cell])
+
+        self.__set_cell_number_format([stock_price_cell, stock_issued_shares_cell, stock_net_income_cell,
+                                       stock_shareholders_equity_cell, stock_market_cap_cell,
+                                       stock_earnings_per_share_cell, stock_pe_ratio_cell, stock_book_value_cell,
+                                       stock_pb_ratio_cell], NUMBER_FORMAT)
+
+        self.__set_cell_number_format([stock_market_cap_percentage_cell], PERCENTAGE_FORMAT)
+
+        return row_cells
+
+    def __create_header_row(self, ws, headers: list[str]) -> list[WriteOnlyCell]:
+        header_cells = []
+        for header in headers:
+            header_cell = WriteOnlyCell(ws, value=header)
+            header_cell.font = HEADER_FONT
+            header_cell.style = 'Headline 1'
+            header_cell.alignment = CENTER_WRAP_ALIGNMENT
+            header_cells.append(header_cell)
+        return header_cells
+
+    def __add_table(self, ws, name: str, ref: str, headers: list[str]) -> None:
+        table = Table(displayName=name, ref=ref)
+        # write-only sheets can't be read back, so the table columns are not inferred from the header row on save
+        table.tableColumns = [TableColumn(id=index + 1, name=header) for index, header in enumerate(headers)]
         table.tableStyleInfo = TableStyleInfo(name='TableStyleLight20', showFirstColumn=False, showLastColumn=False,
                                               showRowStripes=True, showColumnStripes=False)
-        ws.add_table(table)
-
-    def __create_market_table_row(self, ws, stock: Stock, start_row: int):
-        stock_name_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.COMPANY.value + 1, start_row)
-        stock_price_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.PRICE.value + 1, start_row)
-        stock_issued_shares_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.ISSUED_SHARES.value + 1,
-                                                        start_row)
-        stock_net_income_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.NET_INCOME.value + 1, start_row)
-        stock_shareholders_equity_cell = self.__get_cell_name(
-            FinancialIndicatorsColumnsIndex.SHAREHOLDERS_EQUITY.value + 1, start_row)
-        stock_market_cap_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.MARKET_CAP.value + 1, start_row)
-        stock_market_cap_percentage_cell = self.__get_cell_name(
-            FinancialIndicatorsColumnsIndex.MARKET_CAP_PERCENTAGE.value + 1, start_row)
-        stock_earnings_per_share_cell = self.__get_cell_name(
-            FinancialIndicatorsColumnsIndex.EARNINGS_PER_SHARE.value + 1, start_row)
-        stock_pe_ratio_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.P_E_RATIO.value + 1, start_row)
-        stock_book_value_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.BOOK_VALUE.value + 1, start_row)
-        stock_pb_ratio_cell = self.__get_cell_name(FinancialIndicatorsColumnsIndex.P_B_RATIO.value + 1, start_row)
-
-        ws[stock_name_cell] = stock.name if stock.name else ''
-        ws[stock_price_cell] = stock.price if stock.price else ''
-        ws[stock_issued_shares_cell] = stock.issued_shares if stock.issued_shares else ''
-        ws[stock_net_income_cell] = stock.net_profit if stock.net_profit else ''
-        ws[stock_shareholders_equity_cell] = stock.shareholders_equity if stock.shareholders_equity else ''
-        ws[stock_market_cap_cell] = stock.market_cap if stock.market_cap else ''
-        ws[stock_market_cap_percentage_cell] = stock.market_cap_percentage if stock.market_cap_percentage else ''
-        ws[stock_earnings_per_share_cell] = stock.earnings_per_share if stock.earnings_per_share else ''
-        ws[stock_pe_ratio_cell] = stock.benchmark.p_e if stock.benchmark.p_e else ''
-        ws[stock_book_value_cell] = stock.book_value_per_share if stock.book_value_per_share else ''
-        ws[stock_pb_ratio_cell] = stock.benchmark.p_b if stock.benchmark.p_b else ''
-
-        self.__center_align_cells(ws, [stock_price_cell, stock_issued_shares_cell, stock_net_income_cell,
-                                       stock_shareholders_equity_cell, stock_market_cap_cell,
-                                       stock_market_cap_percentage_cell, stock_earnings_per_share_cell,
-                                       stock_pe_ratio_cell, stock_book_value_cell, stock_pb_ratio_cell])
-
-        self.__center_align_cells(ws, [stock_name_cell], wrap_text=True)
-
-        self.__bold_cells(ws, [stock_net_income_cell, stock_market_cap_cell, stock_pe_ratio_cell, stock_pb_ratio_cell])
-
-        self.__set_cell_number_format(ws, [stock_price_cell, stock_issued_shares_cell, stock_net_income_cell,
-                                           stock_shareholders_equity_cell, stock_market_cap_cell,
-                                           stock_earnings_per_share_cell, stock_pe_ratio_cell, stock_book_value_cell,
-                                           stock_pb_ratio_cell], '0.00')
+        with warnings.catch_warnings():
+            warnings.filterwarnings('ignore', message='In write-only mode you must add table columns manually')
+            ws.add_table(table)
 
-        self.__set_cell_number_format(ws, [stock_market_cap_percentage_cell], '0.00%')
+    def __append_empty_rows(self, ws, count: int) -> None:
+        for _ in range(count):
+            ws.append([])
 
     def __get_cell_name_stock_table(self, col_name: str, row_index: int) -> str:
-        col_index = self.stocks_table_cols.index(col_name)
-        return f'{chr(65 + col_index)}{row_index}'
+        return f'{self.stocks_table_cols_letter[col_name]}{row_index}'
 
     def __get_cell_name(self, col_index: int, row_index: int) -> str:
-        return f'{chr(65 + col_index)}{row_index}'
+        return f'{get_column_letter(col_index + 1)}{row_index}'
 
-    def __center_align_cells(self, ws, cells: str, wrap_text=False) -> None:
+    def __center_align_cells(self, cells: list[WriteOnlyCell], wrap_text=False) -> None:
+        alignment = CENTER_WRAP_ALIGNMENT if wrap_text else CENTER_ALIGNMENT
         for cell in cells:
-            ws[cell].alignment = Alignment(horizontal='center', vertical='center', wrap_text=wrap_text)
+            cell.alignment = alignment
 
-    def __bold_cells(self, ws, cells: str) -> None:
+    def __bold_cells(self, cells: list[WriteOnlyCell]) -> None:
         for cell in cells:
-            ws[cell].font = Font(bold=True)
+            cell.font = BOLD_FONT
 
-    def __set_cell_number_format(self, ws, cells: str, format: str) -> None:
+    def __set_cell_number_format(self, cells: list[WriteOnlyCell], format: str) -> None:
         for cell in cells:
-            ws[cell].number_format = format
+            cell.number_format = format
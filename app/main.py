@@ -30,19 +30,23 @@ def get_today_stock_data() -> StockData:
 
     if today_stock_data is None:
         stocks = stock_scraper.scrape_list(stocks_to_scrape)
+        all_success = all(stock.success_scraping for stock in stocks)
     elif today_stock_data.all_success:
-        stocks = [stock for stock in today_stock_data.stocks if stock.code in stocks_to_scrape]
+        stocks_to_scrape_set = set(stocks_to_scrape)
+        stocks = [stock for stock in today_stock_data.stocks if stock.code in stocks_to_scrape_set]
+        all_success = True
     else:
         stocks: list[Stock] = []
+        all_success = True
+        today_stocks_by_code = {s.code: s for s in today_stock_data.stocks}
         for stock_to_scrape in stocks_to_scrape:
-            stock_obj = next((s for s in today_stock_data.stocks if s.code == stock_to_scrape), None)
+            stock_obj = today_stocks_by_code.get(stock_to_scrape)
             if stock_obj is not None and stock_obj.success_scraping:
                 stocks.append(stock_obj)
             else:
                 stock = stock_scraper.scrape_one(stock_to_scrape)
                 stocks.append(stock)
-
-    all_success = all(map(lambda stock: stock.success_scraping, stocks))
+                all_success = all_success and stock.success_scraping
 
     return StockData(all_success=all_success, date=datetime.today().date(), stocks=stocks)
 
@@ -1,19 +1,40 @@
-import json
 import logging
-import time
-from datetime import datetime
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
 from enum import Enum
-from functools import lru_cache
 
 import bs4
+import orjson
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
+from requests.adapters import HTTPAdapter
+from requests_cache import CachedSession, DO_NOT_CACHE
 from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.remote.webelement import WebElement
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support.ui import WebDriverWait
+from urllib3.util.retry import Retry
 
 from config import config, Stock, Dividend, Benchmark, FairValue, FinancialIndicators
 
+DIVIDEND_DATE_PATTERN = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})')
+
+DIVIDEND_ROWS_SELECTOR = '#issuerTable tbody tr'
+DIVIDEND_ROWS_SCRIPT = (f"return Array.from(document.querySelectorAll('{DIVIDEND_ROWS_SELECTOR}'))"
+                        ".map(row => Array.from(row.querySelectorAll('td')).map(cell => cell.innerText.trim()));")
+
+NUMBER_SEPARATORS_TABLE = str.maketrans('', '', ', ')
+
+FINBOX_TICKER_PLACEHOLDER = '__TICKER__'
+FINBOX_HEADERS = {'Content-Type': 'application/json'}
+
+# the strainer sees the raw class attribute, so match the class as one token among others
+FINANCIAL_INDICATORS_STRAINER = SoupStrainer('table', class_=re.compile(r'(^|\s)Table3(\s|$)'))
+STOCK_PAGE_STRAINER = SoupStrainer(
+    'div', class_=re.compile(r'(^|\s)(price_name|market_capital|table_updates|corporate)(\s|$)'))
+
 
 class FinancialIndicatorsColumnsIndex(Enum):
     INDUSTRY_GROUP = 0
@@ -31,6 +52,8 @@ class FinancialIndicatorsColumnsIndex(Enum):
 
 
 class StockScraper:
+    financial_indicators_cache: dict[tuple[str, date], FinancialIndicators | None] = {}
+
     def __init__(self) -> None:
         self.tadawul_stock_scraping_url = f'{config.tadawul.url}/{config.tadawul.session_key}'
         self.financial_indicators_url = config.tadawul.financial_indicators_url
@@ -38,27 +61,82 @@ class StockScraper:
         self.finbox_fair_value_query = config.finbox.fair_value_query
         self.finbox_asset_benchmark_query = config.finbox.asset_benchmark_query
         self.finbox_cookies = config.finbox.cookies
+        self.finbox_fair_value_payload = self.__encode_finbox_payload(self.finbox_fair_value_query)
+        self.finbox_asset_benchmark_payload = self.__encode_finbox_payload(self.finbox_asset_benchmark_query)
         self.unkown_stock_name = 'Unknown'
+        self.max_scraping_workers = 8
+        self.session = self.__create_session()
+        self.drivers: dict[int, webdriver.Firefox] = {}
+        self.drivers_lock = threading.Lock()
 
     def scrape_list(self, stocks: list[int]) -> list[Stock]:
-        return [self.__scrape_stock_info(self.tadawul_stock_scraping_url, stock_code) for stock_code in stocks]
+        financial_indicators = self.scrape_financial_indicators()
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_scraping_workers) as executor:
+                return list(executor.map(
+                    lambda stock_code: self.__scrape_stock_info(
+                        self.tadawul_stock_scraping_url, stock_code, financial_indicators),
+                    stocks))
+        finally:
+            self.close_drivers()
 
     def scrape_one(self, stock_code: int) -> Stock:
-        return self.__scrape_stock_info(self.tadawul_stock_scraping_url, stock_code)
+        try:
+            return self.__scrape_stock_info(
+                self.tadawul_stock_scraping_url, stock_code, self.scrape_financial_indicators())
+        finally:
+            self.__close_driver(threading.get_ident())
+
+    def close_drivers(self) -> None:
+        with self.drivers_lock:
+            drivers = list(self.drivers.values())
+            self.drivers.clear()
+
+        for driver in drivers:
+            self.__quit_driver(driver)
+
+    def __close_driver(self, thread_id: int) -> None:
+        with self.drivers_lock:
+            driver = self.drivers.pop(thread_id, None)
+
+        if driver is not None:
+            self.__quit_driver(driver)
+
+    def __quit_driver(self, driver: webdriver.Firefox) -> None:
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.exception(f'Failed to close Firefox driver. Error: {e}')
+
+    def __get_driver(self) -> webdriver.Firefox:
+        thread_id = threading.get_ident()
+        with self.drivers_lock:
+            driver = self.drivers.get(thread_id)
+        if driver is None:
+            driver = webdriver.Firefox()
+            with self.drivers_lock:
+                self.drivers[thread_id] = driver
+        return driver
 
-    @lru_cache(maxsize=1)
     def scrape_financial_indicators(self) -> FinancialIndicators | None:
+        cache_key = (self.financial_indicators_url, datetime.today().date())
+        if cache_key not in StockScraper.financial_indicators_cache:
+            StockScraper.financial_indicators_cache = {cache_key: self.__scrape_financial_indicators()}
+        return StockScraper.financial_indicators_cache[cache_key]
+
+    def __scrape_financial_indicators(self) -> FinancialIndicators | None:
         scrapping_url = self.financial_indicators_url
-        response = requests.get(scrapping_url)
+        response = self.session.get(scrapping_url)
 
         if response.status_code != 200:
             logging.error(f'Failed to scrape financial indicators')
             return None
 
-        data = BeautifulSoup(response.text, 'html.parser')
+        data = BeautifulSoup(response.content, 'lxml', parse_only=FINANCIAL_INDICATORS_STRAINER)
         logging.info(f'Financial indicators scraped successfully')
 
-        table = data.find('table', {'class': 'Table3'})
+        table = data.select_one('table.Table3')
         if table is None:
             logging.error(f'Failed to find financial indicators table')
             return None
@@ -68,45 +146,34 @@ class StockScraper:
             table_headers = [header.text.strip() for header in rows[0].find_all('th')]
             stocks: list[Stock] = []
             industry_groups: list[str] = []
+            # group rows follow their stocks, so every stock after this index still waits for its group
+            unassigned_stocks_start = 0
 
             for row in rows[1:]:
-                row_data = {table_headers[i]: cell.text.strip() for i, cell in enumerate(row.find_all('td'))}
-                is_industry_group_row = row_data[table_headers[FinancialIndicatorsColumnsIndex.PRICE.value]] == ''
+                cells = [cell.text.strip() for cell in row.find_all('td', recursive=False)]
+                is_industry_group_row = cells[FinancialIndicatorsColumnsIndex.PRICE.value] == ''
 
                 if is_industry_group_row:
-                    industry_group_name = row_data[table_headers[FinancialIndicatorsColumnsIndex.INDUSTRY_GROUP.value]]
+                    industry_group_name = cells[FinancialIndicatorsColumnsIndex.INDUSTRY_GROUP.value]
                     industry_groups.append(industry_group_name)
-                    for i in range(len(stocks) - 1, -1, -1):
-                        if stocks[i].industry_group == None:
-                            stocks[i].industry_group = industry_group_name
-                        else:
-                            break
+                    for stock in stocks[unassigned_stocks_start:]:
+                        stock.industry_group = industry_group_name
+                    unassigned_stocks_start = len(stocks)
                 else:
+                    numbers = [self.__cast_to_float(cell) for cell in cells]
                     stock = Stock(
-                        name=row_data[table_headers[FinancialIndicatorsColumnsIndex.COMPANY.value]],
-                        price=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.PRICE.value]]),
-                        issued_shares=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.ISSUED_SHARES.value]].replace(',',
-                                                                                                                 '')),
-                        net_profit=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.NET_INCOME.value]].replace(',', '')),
-                        shareholders_equity=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.SHAREHOLDERS_EQUITY.value]].replace(
-                                ',', '')),
-                        market_cap=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.MARKET_CAP.value]].replace(',', '')),
-                        market_cap_percentage=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.MARKET_CAP_PERCENTAGE.value]]),
-                        earnings_per_share=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.EARNINGS_PER_SHARE.value]]),
-                        book_value_per_share=self.__cast_to_float(
-                            row_data[table_headers[FinancialIndicatorsColumnsIndex.BOOK_VALUE.value]]),
+                        name=cells[FinancialIndicatorsColumnsIndex.COMPANY.value],
+                        price=numbers[FinancialIndicatorsColumnsIndex.PRICE.value],
+                        issued_shares=numbers[FinancialIndicatorsColumnsIndex.ISSUED_SHARES.value],
+                        net_profit=numbers[FinancialIndicatorsColumnsIndex.NET_INCOME.value],
+                        shareholders_equity=numbers[FinancialIndicatorsColumnsIndex.SHAREHOLDERS_EQUITY.value],
+                        market_cap=numbers[FinancialIndicatorsColumnsIndex.MARKET_CAP.value],
+                        market_cap_percentage=numbers[FinancialIndicatorsColumnsIndex.MARKET_CAP_PERCENTAGE.value],
+                        earnings_per_share=numbers[FinancialIndicatorsColumnsIndex.EARNINGS_PER_SHARE.value],
+                        book_value_per_share=numbers[FinancialIndicatorsColumnsIndex.BOOK_VALUE.value],
                         benchmark=Benchmark(
-                            p_e=self.__cast_to_float(
-                                row_data[table_headers[FinancialIndicatorsColumnsIndex.P_E_RATIO.value]]),
-                            p_b=self.__cast_to_float(
-                                row_data[table_headers[FinancialIndicatorsColumnsIndex.P_B_RATIO.value]])
+                            p_e=numbers[FinancialIndicatorsColumnsIndex.P_E_RATIO.value],
+                            p_b=numbers[FinancialIndicatorsColumnsIndex.P_B_RATIO.value]
                         )
                     )
                     stocks.append(stock)
@@ -126,27 +193,43 @@ class StockScraper:
             date=datetime.today().date()
         )
 
-    def __scrape_stock_info(self, tadawul_scraping_url: str, stock_code: int) -> Stock:
+    def __create_session(self) -> requests.Session:
+        session = CachedSession(
+            config.http_cache.file_name,
+            expire_after=DO_NOT_CACHE,
+            urls_expire_after={
+                self.financial_indicators_url: config.http_cache.financial_indicators_expire_after,
+                self.tadawul_stock_scraping_url: config.http_cache.stock_page_expire_after,
+            },
+        )
+
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_scraping_workers,
+                              max_retries=Retry(total=3, backoff_factor=0.2))
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def __scrape_stock_info(self, tadawul_scraping_url: str, stock_code: int,
+                            financial_indicators: FinancialIndicators | None) -> Stock:
         stock = Stock(code=stock_code, scraped_at=datetime.now())
 
         scraping_url = f'{tadawul_scraping_url}/?companySymbol={stock_code}'
-        response = requests.get(scraping_url)
+        response = self.session.get(scraping_url)
 
         if response.status_code != 200:
             logging.error(f'Failed to scrape stock info [{stock_code}]')
             stock.success_scraping = False
             return stock
 
-        data = BeautifulSoup(response.text, 'html.parser')
+        data = BeautifulSoup(response.content, 'lxml', parse_only=STOCK_PAGE_STRAINER)
         logging.info(f'Stock info scraped successfully [{stock_code}]')
 
         stock.name = self.__extract_stock_name(data, stock_code)
         logging.info(f'Stock [{stock_code}] name is {stock.name}')
 
-        stock.sector = self.__extract_stock_sector(data, stock_code)
-        logging.info(f'Stock [{stock.name}] sector is {stock.sector}')
-
         stock.industry_group = self.__extract_stock_industry_group(data, stock_code)
+        stock.sector = stock.industry_group
+        logging.info(f'Stock [{stock.name}] sector is {stock.sector}')
         logging.info(f'Stock [{stock.name}] industry group is {stock.industry_group}')
 
         stock.price = self.__extract_stock_price(data, stock_code)
@@ -166,7 +249,7 @@ class StockScraper:
         # if stock.fair_value:
         #     logging.info(f'Fair value for {stock.name} is {stock.fair_value.average}')
 
-        self.__update_stocks_info_from_financial_indicators(stock)
+        self.__update_stocks_info_from_financial_indicators(stock, financial_indicators)
 
         if stock.name == self.unkown_stock_name or stock.sector is None or stock.industry_group is None or stock.price < 0 or stock._52_week_high < 0 or stock._52_week_low < 0 \
                 or stock.dividends is None:  # or stock.fair_value is None:
@@ -178,42 +261,32 @@ class StockScraper:
 
     def __extract_stock_name(self, data: bs4.BeautifulSoup, stock_code: int) -> str:
         try:
-            return data.find('div', {'class': 'price_name'}).find('div', {'class': 'name'}).text.strip()
+            return data.select_one('div.price_name div.name').text.strip()
         except Exception as e:
             logging.exception(f'Failed to extract stock name for stock [{stock_code}]. Error: {e}')
             return self.unkown_stock_name
 
-    def __extract_stock_sector(self, data: bs4.BeautifulSoup, stock_code: int) -> str:
-        try:
-            return data.find('div', {'class': 'market_capital'}).find_all('li')[1].text.strip()
-        except Exception as e:
-            logging.exception(f'Failed to extract stock sector for stock [{stock_code}]. Error: {e}')
-            return None
-
     def __extract_stock_industry_group(self, data: bs4.BeautifulSoup, stock_code: int) -> str:
         try:
-            return data.find('div', {'class': 'market_capital'}).find_all('li')[1].text.strip()
+            # the second market_capital item has always been used for both sector and industry group,
+            # its position is not verified against the live page
+            return data.select_one('div.market_capital').find_all('li')[1].text.strip()
         except Exception as e:
             logging.exception(f'Failed to extract industry group for stock [{stock_code}]. Error: {e}')
             return None
 
     def __extract_stock_price(self, data: bs4.BeautifulSoup, stock_code: int) -> float:
         try:
-            return float(data.find('div', {'class': 'table_updates'})
-                         .find('div', {'class': 'main_trade_box'})
-                         .find('div', {'class': 'price'})
-                         .text.strip())
+            return float(data.select_one('div.table_updates div.main_trade_box div.price').text.strip())
         except Exception as e:
             logging.exception(f'Failed to extract stock price for stock [{stock_code}]. Error: {e}')
             return -1
 
     def __extract_52_week_prices(self, data: bs4.BeautifulSoup, stock_code: int) -> tuple[float, float]:
         try:
-            stock_52_week = data.find('div', {'class': 'table_updates'}).find('div', {'class': 'week_52'})
-            stock_52_week_min = float(
-                stock_52_week.find('div', {'class': 'week_col low'}).find('div', {'class': 'price'}).text.strip())
-            stock_52_week_max = float(
-                stock_52_week.find('div', {'class': 'week_col high'}).find('div', {'class': 'price'}).text.strip())
+            stock_52_week = data.select_one('div.table_updates div.week_52')
+            stock_52_week_min = float(stock_52_week.select_one('div.week_col.low div.price').text.strip())
+            stock_52_week_max = float(stock_52_week.select_one('div.week_col.high div.price').text.strip())
 
             return stock_52_week_max, stock_52_week_min
         except Exception as e:
@@ -222,81 +295,78 @@ class StockScraper:
 
     def __extract_stock_dividends(self, data: bs4.BeautifulSoup, stock_code: int) -> list[Dividend] or None:
         try:
-            dividend_page_path = data.find('div', {'class': 'corporate'}) \
-                .find('div', {'id': 'dividendsButton'}) \
-                .find('a')['href']
+            dividend_page_path = data.select_one('div.corporate div#dividendsButton a')['href']
 
             dividend_page_url = 'https://' + self.tadawul_stock_scraping_url.split('/')[2] + dividend_page_path
 
-            driver = webdriver.Firefox()
+            driver = self.__get_driver()
 
             driver.get(dividend_page_url)
 
-            dividends_table = driver.find_element(By.ID, 'issuerTable')
-
-            dividends_not_found = self.__wait_for_dividend_table(dividends_table, 3, 0.5)
+            dividends_not_found = self.__wait_for_dividend_table(driver, 3, 0.1)
 
             if not dividends_not_found:
                 logging.error(f'Failed to scrape dividends table [{stock_code}]')
                 return None
 
-            dividends_rows = (dividends_table
-                              .find_element(By.TAG_NAME, 'tbody')
-                              .find_elements(By.TAG_NAME, 'tr'))
+            dividends_rows = driver.execute_script(DIVIDEND_ROWS_SCRIPT)
 
             dividends = [self.__extract_dividends_row(dividend_row, stock_code) for dividend_row in
                          dividends_rows]
 
-            driver.close()
-
             return list(filter(lambda dividend: dividend is not None, dividends))
         except Exception as e:
             logging.exception(f'Failed to extract stock dividends. Error: {e}')
             return None
 
-    def __wait_for_dividend_table(self, table: WebElement, timeout: float, poll_frequency: float) -> bool:
-        end_time = time.monotonic() + timeout
-        while True:
-            if time.monotonic() > end_time:
-                return False
-
-            rows = (table
-                    .find_element(By.TAG_NAME, 'tbody')
-                    .find_elements(By.TAG_NAME, 'tr'))
+    def __wait_for_dividend_table(self, driver: webdriver.Firefox, timeout: float, poll_frequency: float) -> bool:
+        def dividend_rows_displayed(driver: webdriver.Firefox) -> bool:
+            rows = driver.find_elements(By.CSS_SELECTOR, DIVIDEND_ROWS_SELECTOR)
+            return len(rows) > 1 and all(r.is_displayed() for r in rows)
 
-            if len(rows) > 1 and all(r.is_displayed() for r in rows):
-                return True
-
-            time.sleep(poll_frequency)
+        try:
+            return WebDriverWait(driver, timeout, poll_frequency=poll_frequency).until(dividend_rows_displayed)
+        except TimeoutException:
+            return False
 
-    def __extract_dividends_row(self, row: WebElement, stock_code: int) -> Dividend | None:
-        date_format = '%Y-%m-%d'
-        tds = row.find_elements(By.TAG_NAME, 'td')
+    def __extract_dividends_row(self, tds: list[str], stock_code: int) -> Dividend | None:
         try:
             return Dividend(
-                announcement_date=datetime.strptime(tds[2].text, date_format),
-                due_date=datetime.strptime(tds[3].text, date_format),
-                distribution_date=datetime.strptime(tds[5].text, date_format),
-                distribution_way=tds[4].text,
-                amount=float(tds[6].text)
+                announcement_date=self.__parse_dividend_date(tds[2]),
+                due_date=self.__parse_dividend_date(tds[3]),
+                distribution_date=self.__parse_dividend_date(tds[5]),
+                distribution_way=tds[4],
+                amount=float(tds[6])
             )
         except Exception as e:
             logging.exception(f'Failed to extract dividend row for stock [{stock_code}]. Error: {e}')
             return None
 
+    def __parse_dividend_date(self, value: str) -> datetime:
+        match = DIVIDEND_DATE_PATTERN.fullmatch(value)
+        if match is None:
+            raise ValueError(f'Invalid dividend date {value!r}')
+        year, month, day = match.groups()
+        return datetime(int(year), int(month), int(day))
+
+    def __encode_finbox_payload(self, query: str) -> bytes:
+        return orjson.dumps({'query': query, 'variables': {'ticker': FINBOX_TICKER_PLACEHOLDER}})
+
+    def __fill_finbox_payload(self, payload: bytes, stock_code: int) -> bytes:
+        return payload.replace(FINBOX_TICKER_PLACEHOLDER.encode(), f'SASE:{stock_code}'.encode(), 1)
+
     def __scrape_stock_benchmark(self, stock_code: int) -> Benchmark:
-        headers = {'Content-Type': 'application/json'}
-        data = {'query': self.finbox_asset_benchmark_query, 'variables': {'ticker': f'SASE:{stock_code}'}}
+        data = self.__fill_finbox_payload(self.finbox_asset_benchmark_payload, stock_code)
 
-        response = requests.post(self.finbox_fair_value_scraping_url, headers=headers, data=json.dumps(data),
-                                 cookies=self.finbox_cookies)
+        response = self.session.post(self.finbox_fair_value_scraping_url, data=data, headers=FINBOX_HEADERS,
+                                     cookies=self.finbox_cookies)
 
         if response.status_code != 200:
             logging.error(f'Failed to scrape stock benchmark [{stock_code}]')
             return Benchmark()
 
         try:
-            stats = response.json()['data']['asset']['stats']
+            stats = orjson.loads(response.content)['data']['asset']['stats']
             return Benchmark(
                 div_yield=float(stats['quote']['div_yield']['company'])
             )
@@ -305,29 +375,26 @@ class StockScraper:
             return Benchmark()
 
     def __scrape_fair_value(self, stock_code: int) -> FairValue | None:
-        headers = {'Content-Type': 'application/json'}
-        data = {'query': self.finbox_fair_value_query, 'variables': {'ticker': f'SASE:{stock_code}'}}
+        data = self.__fill_finbox_payload(self.finbox_fair_value_payload, stock_code)
 
-        response = requests.post(self.finbox_fair_value_scraping_url, headers=headers, data=json.dumps(data))
+        response = self.session.post(self.finbox_fair_value_scraping_url, data=data, headers=FINBOX_HEADERS)
         if response.status_code != 200:
             logging.error(f'Failed to scrape fair value for [{stock_code}]')
             return None
 
         try:
-            fair_value = response.json()['data']['asset']['fair_value']
+            fair_value = orjson.loads(response.content)['data']['asset']['fair_value']
             return FairValue(average=float(fair_value['averages']['price']), uncertainty=fair_value['uncertainty'])
         except Exception as e:
             logging.exception(f'Failed to extract fair value for stock [{stock_code}]. Error: {e}')
             return None
 
-    def __update_stocks_info_from_financial_indicators(self, stock: Stock):
-        financial_indicators: FinancialIndicators = self.scrape_financial_indicators()
+    def __update_stocks_info_from_financial_indicators(self, stock: Stock,
+                                                        financial_indicators: FinancialIndicators | None):
         if financial_indicators is None:
             return
 
-        stock_from_financial_indicators = next(
-            (s for s in financial_indicators.stocks if s.name.lower() == stock.name.lower() and \
-             s.industry_group.lower() == stock.industry_group.lower()), None)
+        stock_from_financial_indicators = financial_indicators.stocks_index.get(stock.name_key())
         if stock_from_financial_indicators is None:
             logging.error(f'Failed to find stock [{stock.name}] in financial indicators')
             return
@@ -344,6 +411,9 @@ class StockScraper:
         logging.info(f'Stock [{stock.name}] info was updated from financial indicators')
 
     def __cast_to_float(self, value: str) -> float:
+        value = value.translate(NUMBER_SEPARATORS_TABLE)
+        if value == '' or value == '-':
+            return None
         try:
             return float(value)
         except ValueError:
@@ -4,8 +4,6 @@ import os
 from datetime import datetime, timedelta
 from functools import lru_cache
 
-from dacite import from_dict, Config as DaciteConfig
-
 from config import config, StockData
 
 
@@ -16,28 +14,29 @@ class StorageManager:
         self.__create_folder_if_not_exists()
 
         self.__existing_files, self.__latest_file = self.__get_existing_files()
-        self.__files_to_keep = list(map(lambda date: date.strftime('%Y-%m-%d') + '.json',
-                                        self.__get_last_n_days(config.storage.keep_last_files_count)))
+        self.__files_to_keep = frozenset(map(lambda date: date.strftime('%Y-%m-%d') + '.json',
+                                             self.__get_last_n_days(config.storage.keep_last_files_count)))
         self.__remove_old_files()
 
     def store_stock_date(self, stock_data: StockData) -> StockData:
         file_name = stock_data.date.strftime('%Y-%m-%d') + '.json'
         with open(os.path.join(self.__folder_name, file_name), 'w') as f:
-            json = stock_data.to_json()
-            f.write(json)
+            stock_data.write_json(f)
             logging.info(f'Stock data stored in file {file_name}')
+        # the file was just rewritten, drop anything loaded from it before
+        self.__get_stock_date_from_file.cache_clear()
         return self.__get_stock_date_from_file(file_name)
 
-    @lru_cache(maxsize=1)
     def get_stock_data_by_date(self, date: datetime) -> StockData:
         file_name = date.strftime('%Y-%m-%d') + '.json'
         return self.__get_stock_date_from_file(file_name)
 
+    @lru_cache(maxsize=32)
     def __get_stock_date_from_file(self, file_name) -> StockData | None:
         try:
-            file = open(os.path.join(self.__folder_name, file_name), 'r')
-            data = json.load(file)
-            return from_dict(data_class=StockData, data=data, config=DaciteConfig(check_types=False))
+            with open(os.path.join(self.__folder_name, file_name), 'r') as file:
+                data = json.load(file)
+            return StockData.from_dict(data)
         except Exception as e:
             logging.error(f'Error while fetching stock file date [{file_name}]. error : {e}')
             return None
@@ -51,13 +50,19 @@ class StorageManager:
             logging.info(f'Created folder {self.__folder_name}')
 
     def __get_existing_files(self) -> tuple[list[str], str]:
-        files = list(
-            filter(lambda file: file.endswith('.json') and len(file.split('-')) == 3, os.listdir(self.__folder_name)))
-        files.sort(reverse=True)
+        with os.scandir(self.__folder_name) as entries:
+            files = sorted((entry.name for entry in entries
+                            if entry.name.endswith('.json') and entry.name.count('-') == 2
+                            and entry.is_file(follow_symlinks=False)),
+                           reverse=True)
         return files, files[0] if len(files) > 0 else None
 
     def __remove_old_files(self) -> None:
+        removed_files = []
         for file in self.__existing_files:
             if file not in self.__files_to_keep and file != self.__latest_file:
                 os.remove(os.path.join(self.__folder_name, file))
-                logging.info(f'Removed file {file}')
+                removed_files.append(file)
+
+        if removed_files:
+            logging.info(f'Removed {len(removed_files)} old files: {removed_files}')